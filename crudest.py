@@ -1,20 +1,30 @@
 import collections
-import re
+import functools
+import hashlib
+import os
+import time
 from abc import ABC, abstractmethod
 
 import flask_jwt_extended
 from apispec import APISpec
 from apispec.ext.marshmallow import MarshmallowPlugin
-from flask import jsonify, request, Blueprint
+from flask import (current_app, has_request_context, json as flask_json, request,
+                   Blueprint, _app_ctx_stack)
 from flask.helpers import make_response, url_for
 from flask.views import MethodView
 from flask_jwt_extended import (JWTManager, create_access_token,
                                 create_refresh_token, get_jti, get_jwt_claims,
                                 get_jwt_identity)
 from flask_swagger_ui import get_swaggerui_blueprint
+from marshmallow import Schema, ValidationError, missing
 from webargs import fields
 from webargs.flaskparser import parser, use_kwargs
 
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
 __all__ = [
     'Resource',
     'CreateResource',
@@ -44,6 +54,128 @@ __all__ = [
 ]
 
 
+def _json_response(payload):
+    """
+    Generate a JSON response for the given payload, using orjson's C-level
+    encoder when it is installed and falling back to flask's json module
+    otherwise. Values orjson cannot encode natively (e.g. Decimal) are
+    rendered through str, and non-string dict keys are coerced like the
+    stdlib encoder does, so both encoders produce the same output.
+    Constructing the response directly skips jsonify's content-type
+    detection and pretty-print checks on the hot path.
+    """
+    if orjson is not None:
+        body = orjson.dumps(payload, default=str, option=orjson.OPT_NON_STR_KEYS)
+    else:
+        body = flask_json.dumps(payload)
+    return current_app.response_class(body, mimetype='application/json')
+
+
+@functools.lru_cache(maxsize=4096)
+def _cached_url_for(app_id, endpoint, scheme, host, root, items, method=None, external=True):
+    """
+    url_for re-walks the url map and re-formats the full URL on every call,
+    while the (endpoint, kwargs) combinations repeat heavily across requests.
+    Memoize the resulting strings; the app, request scheme, host and mount
+    point are part of the key because the generated links are external URLs
+    by default and the cache is shared between apps in the same process.
+    """
+    return url_for(endpoint, _method=method, _external=external, **dict(items))
+
+
+def _request_url_for(endpoint, items, method=None, external=True):
+    """
+    Request-time front end for _cached_url_for: resolves blueprint-relative
+    endpoints against the requesting blueprint so same-named resources on
+    different blueprints never share a cache entry, and keys on the current
+    app plus the request scheme, host and script root so cached links always
+    match the app and the way the request came in.
+    """
+    if endpoint[:1] == '.':
+        blueprint = request.blueprint
+        endpoint = blueprint + endpoint if blueprint else endpoint[1:]
+    return _cached_url_for(
+        id(current_app._get_current_object()), endpoint,
+        request.scheme, request.host, request.script_root,
+        items, method, external
+    )
+
+
+def _parse_body(schema):
+    """
+    Parse the request body with the given schema. JSON and simple form
+    bodies take a fast path that loads Flask's cached payload directly,
+    skipping webargs' location detection; anything else (or an invalid
+    payload) goes through the regular webargs parser, which also takes care
+    of generating the usual 422 error response.
+    """
+    if request.is_json:
+        # silent so empty or undecodable bodies fall through to webargs,
+        # which reports them as the usual 422 instead of a bare 400
+        body = request.get_json(cache=True, silent=True)
+        if body is not None:
+            try:
+                return schema.load(body)
+            except ValidationError:
+                pass
+    elif request.form:
+        try:
+            return schema.load(request.form.to_dict())
+        except ValidationError:
+            pass
+    return parser.parse(schema, request, location='json_or_form')
+
+
+def _compile_dump(schema_cls):
+    """
+    Generate straight-line dump functions for the schema's declared fields
+    and store them on the class, where Response.dump_data picks them up.
+    The generated code calls each bound field serializer directly, skipping
+    marshmallow's per-dump field iteration and processor machinery. Schemas
+    with hooks or overridden dump/get_attribute keep the regular path.
+    """
+    if schema_cls._hooks:
+        return False
+    if (schema_cls.get_attribute is not Schema.get_attribute
+            or schema_cls.dump is not Schema.dump):
+        return False
+    schema = schema_cls()
+    namespace = {'_missing': missing, '_get': schema.get_attribute}
+    fields_src = []
+    for i, (attr_name, field_obj) in enumerate(schema.dump_fields.items()):
+        key = field_obj.data_key if field_obj.data_key is not None else attr_name
+        namespace['_s%d' % i] = field_obj.serialize
+        fields_src.append('%r: _s%d(%r, obj, _get)' % (key, i, attr_name))
+    src = (
+        'def _dump_one(obj):\n'
+        '    d = {%s}\n'
+        '    return {k: v for k, v in d.items() if v is not _missing}\n'
+        'def _dump_many(objs):\n'
+        '    return [_dump_one(obj) for obj in objs]\n'
+    ) % ', '.join(fields_src)
+    exec(compile(src, '<crudest-generated>', 'exec'), namespace)
+    schema_cls.__crudest_dump__ = staticmethod(namespace['_dump_one'])
+    schema_cls.__crudest_dump_many__ = staticmethod(namespace['_dump_many'])
+    return True
+
+
+def _jit_schema(schema_cls):
+    """
+    Swap the given schema class for a subclass that uses a JIT-compiled
+    serializer, so that dumps run through generated straight-line code
+    instead of marshmallow's per-field reflection. When deepfriedmarshmallow
+    is not installed, fall back to the built-in compiled dump functions.
+    """
+    try:
+        from deepfriedmarshmallow import JitSchema  # optional dependency
+    except ImportError:
+        _compile_dump(schema_cls)
+        return schema_cls
+    if issubclass(schema_cls, JitSchema):
+        return schema_cls
+    return type(schema_cls.__name__, (JitSchema, schema_cls), {})
+
+
 class Resource(ABC):
     pass
 
@@ -116,20 +248,28 @@ class Response:
         self._status_code = status_code
         self._links = links if links is not None else {}
 
-    def dump_data(self, schema_cls, many=False):
-        return schema_cls(many=many).dump(self._data)
+    def dump_data(self, schema):
+        dump = getattr(
+            schema, '__crudest_dump_many__' if schema.many else '__crudest_dump__', None
+        )
+        if dump is not None:
+            return dump(self._data)
+        return schema.dump(self._data)
     
     def extend_links(self, base_links):
         if base_links is None:
             return self._links
+        elif not self._links:
+            # no extra links to add, so skip the merge allocation
+            return base_links
         else:
             return {**base_links, **self._links}
 
-    def generate(self, schema_cls, many, base_links=None):
+    def generate(self, schema, base_links=None):
         """
         The base implementation simply generates JSON, ignoring the links.
         """
-        return jsonify(self.dump_data(schema_cls, many=many))
+        return _json_response(self.dump_data(schema))
 
     def get_status_code(self, default=None):
         return self._status_code or default
@@ -141,7 +281,11 @@ class HeadedResponse(Response):
     any other given headers to be added as well.
     """
 
-    CORS_SAFELISTED_HEADERS = {
+    # %-formatting against a precompiled template is cheaper than building
+    # an f-string per link in the response hot path
+    LINK_VALUE_TEMPLATE = '<%s>; rel="%s"'
+
+    CORS_SAFELISTED_HEADERS = frozenset({
         'Cache-Control',
         'Content-Language',
         'Content-Length',
@@ -149,29 +293,31 @@ class HeadedResponse(Response):
         'Expires',
         'Last-Modified',
         'Pragma'
-    }
+    })
 
     def __init__(self, data, status_code=None, links=None, headers=None):
         super().__init__(data, status_code, links)
         self._headers = headers
 
-    def generate(self, schema_cls, many, base_links=None):
-        response = make_response(super().generate(schema_cls, many=many))
-        link_header = ', '.join(
-            f'<{u}>; rel="{n}"'
-            for (n, u) in self.extend_links(base_links).items()
-        )
-        added_headers = set()
-        if link_header:
-            response.headers['Link'] = link_header
-            added_headers.add('Link')
+    def generate(self, schema, base_links=None):
+        response = make_response(super().generate(schema))
+        headers = response.headers
+        expose_headers = []
+        links = self.extend_links(base_links)
+        if links:
+            template = self.LINK_VALUE_TEMPLATE
+            headers['Link'] = ', '.join(
+                [template % (u, n) for (n, u) in links.items()]
+            )
+            expose_headers.append('Link')
         if self._headers is not None:
+            safelisted = self.CORS_SAFELISTED_HEADERS
             for key, value in self._headers.items():
-                response.headers[key] = value
-                added_headers.add(key)
-        expose_headers = added_headers - self.CORS_SAFELISTED_HEADERS
+                headers[key] = value
+                if key not in safelisted and key not in expose_headers:
+                    expose_headers.append(key)
         if expose_headers:
-            response.headers['Access-Control-Expose-Headers'] = ', '.join(expose_headers)
+            headers['Access-Control-Expose-Headers'] = ', '.join(expose_headers)
         return response
 
 
@@ -187,101 +333,230 @@ class WrappedResponse(Response):
         self._data_key = data_key
         self._kwargs = kwargs
     
-    def generate(self, schema_cls, many, base_links=None):
-        return jsonify(
-            links=self.extend_links(base_links),
-            **{
-                self._data_key: self.dump_data(schema_cls, many=many),
-                **self._kwargs
-            }
-        )
+    def generate(self, schema, base_links=None):
+        return _json_response({
+            'links': self.extend_links(base_links),
+            self._data_key: self.dump_data(schema),
+            **self._kwargs
+        })
+
+
+def _returns_raw_data(handler):
+    """
+    True when the handler's return annotation promises plain data rather
+    than a Response, in which case the view can dump and serialize it
+    directly without the Response-wrapping indirection. Only concrete
+    non-Response classes qualify; unannotated handlers keep the generic
+    path since they may return either.
+    """
+    if handler is None:
+        return False
+    rtype = getattr(handler, '__annotations__', {}).get('return')
+    return isinstance(rtype, type) and not issubclass(rtype, Response)
 
 
 class RestView(MethodView):
 
-    @staticmethod
-    def _extract_parent_ids(resource, kwargs):
-        return {p.name: kwargs[p.name] for p in resource.id_params[:-1]}
+    endpoint = None  # filled in on the generated per-resource subclasses
+
+    _schema_cache = {}  # (schema_cls, many, partial) -> shared schema instance
+
+    @classmethod
+    def _get_schema(cls, schema_cls, many=False, partial=False):
+        """
+        Sharing instances between concurrent requests is safe with
+        marshmallow 3: unlike the marshmallow 2 Marshaller, dump() and load()
+        keep their error state in per-call locals rather than on the schema.
+        The setdefault below makes concurrent cache population race-free as
+        well (two threads may build the same variant, but all callers end up
+        with the same instance).
+        """
+        key = (schema_cls, many, partial)
+        schema = cls._schema_cache.get(key)
+        if schema is None:
+            schema = cls._schema_cache.setdefault(key, schema_cls(many=many, partial=partial))
+        return schema
+
+    def _extract_parent_ids(self, kwargs):
+        return {name: kwargs[name] for name in self._parent_id_names}
+
+    def _collection_links(self, parent_ids):
+        return {'collection': _request_url_for(
+            self.endpoint, tuple(sorted(parent_ids.items()))
+        )}
+
+    def _self_links(self, parent_ids):
+        return {'self': _request_url_for(
+            self.endpoint, tuple(sorted(parent_ids.items()))
+        )}
+
+    def _item_links(self, parent_ids, kwargs):
+        # kwargs holds all path parameters, parent ids included, so it can
+        # feed the self link directly without merging the two dicts first
+        return {
+            'self': _request_url_for(
+                self.endpoint, tuple(sorted(kwargs.items()))
+            ),
+            'collection': _request_url_for(
+                self.endpoint, tuple(sorted(parent_ids.items()))
+            )
+        }
 
     def __init__(self, schema_cls, resource, num_ids=1):
         super().__init__()
         self.schema_cls = schema_cls
         self.resource = resource
         self.num_ids = num_ids
+        if self.endpoint is None:
+            self.endpoint = '.' + resource.name
+        # bound once here so the generic extraction fallback reads a local
+        # attribute instead of walking the resource on every request
+        names = getattr(resource, '_parent_id_names', None)
+        if names is None:
+            names = tuple(p.name for p in getattr(resource, 'id_params', ())[:-1])
+        self._parent_id_names = names
+        # schema construction walks all declared fields, so the needed
+        # variants come from a cache shared across all views of the same
+        # schema class; dump() and load() do not mutate the instance, making
+        # reuse safe
+        self._schema = self._get_schema(schema_cls)
+        self._schema_many = self._get_schema(schema_cls, many=True)
+        self._schema_partial = self._get_schema(schema_cls, partial=True)
+        # handlers annotated as returning plain data skip the Response
+        # wrapper entirely; base links are not emitted by the base Response
+        # anyway, so the fast path is behaviorally identical
+        self._dump_one = getattr(schema_cls, '__crudest_dump__', None) or self._schema.dump
+        self._dump_many = getattr(schema_cls, '__crudest_dump_many__', None) or self._schema_many.dump
+        self._raw_create = _returns_raw_data(getattr(resource, 'create', None))
+        self._raw_list = _returns_raw_data(getattr(resource, 'list', None))
+        self._raw_retrieve = _returns_raw_data(getattr(resource, 'retrieve', None))
+        self._raw_replace = _returns_raw_data(getattr(resource, 'replace', None))
+        self._raw_update = _returns_raw_data(getattr(resource, 'update', None))
 
     def post(self, **kwargs):
-        parent_ids = self._extract_parent_ids(self.resource, kwargs)
-        kwargs.update(parser.parse(
-            self.schema_cls(),
-            request,
-            location='json_or_form'
-        ))
+        parent_ids = self._extract_parent_ids(kwargs)
+        kwargs.update(_parse_body(self._schema))
         response = self.resource.create(**kwargs)
+        if self._raw_create:
+            return _json_response(self._dump_one(response)), 201
         if not isinstance(response, Response):
             response = Response(data=response)
-        return response.generate(self.schema_cls, many=False, base_links={
-            'collection': url_for('.' + self.resource.name, _external=True, **parent_ids)
-        }), response.get_status_code(default=201)
+        return response.generate(
+            self._schema, base_links=self._collection_links(parent_ids)
+        ), response.get_status_code(default=201)
 
     def get(self, **kwargs):
-        parent_ids = self._extract_parent_ids(self.resource, kwargs)
+        parent_ids = self._extract_parent_ids(kwargs)
         if len(kwargs) < self.num_ids:
             response = self.resource.list(**kwargs)
+            if self._raw_list:
+                return _json_response(self._dump_many(response)), 200
             if not isinstance(response, Response):
                 response = Response(data=response)
-            return response.generate(self.schema_cls, many=True, base_links={
-                'self': url_for('.' + self.resource.name, _external=True, **parent_ids)
-            }), response.get_status_code(default=200)
+            return response.generate(
+                self._schema_many, base_links=self._self_links(parent_ids)
+            ), response.get_status_code(default=200)
         else:
             response = self.resource.retrieve(**kwargs)
+            if self._raw_retrieve:
+                return _json_response(self._dump_one(response)), 200
             if not isinstance(response, Response):
                 response = Response(data=response)
-            return response.generate(self.schema_cls, many=False, base_links={
-                'self': url_for(
-                    '.' + self.resource.name,
-                    _external=True,
-                    **{**parent_ids, **kwargs}
-                ),
-                'collection': url_for(
-                    '.' + self.resource.name,
-                    _external=True,
-                    **parent_ids
-                )
-            }), response.get_status_code(default=200)
+            return response.generate(
+                self._schema, base_links=self._item_links(parent_ids, kwargs)
+            ), response.get_status_code(default=200)
 
     def put(self, **kwargs):
-        parent_ids = self._extract_parent_ids(self.resource, kwargs)
-        kwargs.update(parser.parse(
-            self.schema_cls(),
-            request,
-            location='json_or_form'
-        ))
+        parent_ids = self._extract_parent_ids(kwargs)
+        kwargs.update(_parse_body(self._schema))
         response = self.resource.replace(**kwargs)
+        if self._raw_replace:
+            return _json_response(self._dump_one(response)), 200
         if not isinstance(response, Response):
             response = Response(data=response)
-        return response.generate(self.schema_cls, many=False, base_links={
-            'collection': url_for('.' + self.resource.name, _external=True, **parent_ids)
-        }), response.get_status_code(default=200)
+        return response.generate(
+            self._schema, base_links=self._collection_links(parent_ids)
+        ), response.get_status_code(default=200)
 
     def patch(self, **kwargs):
-        parent_ids = self._extract_parent_ids(self.resource, kwargs)
-        kwargs.update(parser.parse(
-            self.schema_cls(partial=True),
-            request,
-            location='json_or_form'
-        ))
+        parent_ids = self._extract_parent_ids(kwargs)
+        kwargs.update(_parse_body(self._schema_partial))
         response = self.resource.update(**kwargs)
+        if self._raw_update:
+            return _json_response(self._dump_one(response)), 200
         if not isinstance(response, Response):
             response = Response(data=response)
-        return response.generate(self.schema_cls, many=False, base_links={
-            'collection': url_for('.' + self.resource.name, _external=True, **parent_ids)
-        }), response.get_status_code(default=200)
+        return response.generate(
+            self._schema, base_links=self._collection_links(parent_ids)
+        ), response.get_status_code(default=200)
 
     def delete(self, **kwargs):
         self.resource.delete(**kwargs)
         return '', 204
 
 
+_METHOD_BITS = {'GET': 1, 'PUT': 2, 'DELETE': 4, 'POST': 8, 'PATCH': 16}
+
+# maps every possible method bitmap to the preferred default method for
+# url_for, so picking one is a single dict lookup instead of a loop
+_DEFAULT_METHOD = {
+    bitmap: next(
+        (m for m in ('GET', 'PUT', 'DELETE', 'POST') if bitmap & _METHOD_BITS[m]),
+        None
+    )
+    for bitmap in range(2 ** len(_METHOD_BITS))
+}
+
+
+def _specialized_view_cls(name, id_params):
+    """
+    Generate a RestView subclass specialized for one resource. The parent id
+    extraction is compiled to a plain dict literal with the id names inlined,
+    and the endpoint is baked in as a class attribute, so the per-request
+    boilerplate no longer loops over id_params or rebuilds the endpoint
+    string. Same runtime-codegen idea as JIT-compiled schema serializers,
+    applied to the request handling boilerplate.
+    """
+    parent_names = tuple(p.name for p in id_params[:-1])
+    items = ', '.join('%r: kwargs[%r]' % (n, n) for n in parent_names)
+    src = 'def _extract_parent_ids(self, kwargs):\n    return {%s}\n' % items
+    namespace = {}
+    exec(compile(src, '<crudest-generated>', 'exec'), namespace)
+
+    endpoint = '.' + name
+
+    # closures with the endpoint bound at registration time, so building the
+    # base links costs only a dict-of-one-or-two allocation per request on
+    # top of the memoized url strings
+    def _collection_links(self, parent_ids, _endpoint=endpoint):
+        return {'collection': _request_url_for(
+            _endpoint, tuple(sorted(parent_ids.items()))
+        )}
+
+    def _self_links(self, parent_ids, _endpoint=endpoint):
+        return {'self': _request_url_for(
+            _endpoint, tuple(sorted(parent_ids.items()))
+        )}
+
+    def _item_links(self, parent_ids, kwargs, _endpoint=endpoint):
+        return {
+            'self': _request_url_for(
+                _endpoint, tuple(sorted(kwargs.items()))
+            ),
+            'collection': _request_url_for(
+                _endpoint, tuple(sorted(parent_ids.items()))
+            )
+        }
+
+    return type(name + 'RestView', (RestView,), {
+        'endpoint': endpoint,
+        '_extract_parent_ids': namespace['_extract_parent_ids'],
+        '_collection_links': _collection_links,
+        '_self_links': _self_links,
+        '_item_links': _item_links,
+    })
+
+
 class RestApi:
 
     URL_CONVERTER_TO_TYPE = {
@@ -291,16 +566,51 @@ class RestApi:
         'path': 'string',
     }
 
-    RE_URL = re.compile(r'<(?:([^:<>]+):)?([^<>]+)>')
-
     IdParam = collections.namedtuple('IdParam', ['type', 'name'])
 
+    @classmethod
+    @functools.lru_cache(maxsize=256)
+    def _parse_path(cls, path):
+        """
+        Extract the id params, the swagger-style path ({name} instead of
+        <converter:name>) and the base path (everything up to the last
+        segment) in a single pass over the given url path, scanning for the
+        <> delimiters directly instead of running a regex. Paths are string
+        literals fixed at registration time, so the results are memoized and
+        shared between add_resource and add_path.
+        """
+        id_params = []
+        swagger_parts = []
+        pos = 0
+        while True:
+            start = path.find('<', pos)
+            if start == -1:
+                break
+            end = path.find('>', start)
+            if end == -1:
+                # unterminated placeholder; treat the rest as literal text,
+                # like the regex-based parser did
+                break
+            type_, sep, name = path[start + 1:end].partition(':')
+            if not sep:
+                type_, name = None, type_
+            id_params.append(cls.IdParam(cls.URL_CONVERTER_TO_TYPE.get(type_, 'string'), name))
+            swagger_parts.append(path[pos:start])
+            swagger_parts.append('{%s}' % name)
+            pos = end + 1
+        swagger_parts.append(path[pos:])
+        return tuple(id_params), ''.join(swagger_parts), path[:path.rfind('/')]
+
     def __init__(
         self, app, title, version='v1', spec_path='/spec', docs_path='/docs', servers=None,
-        security_schemes=None, default_security_scheme=None
+        security_schemes=None, default_security_scheme=None, jit=None,
+        jwt_access_token_expires=None
     ):
         self.app = app
-        self.resource_methods = collections.defaultdict(set)
+        self.resource_methods = collections.defaultdict(int)  # name -> method bitmap
+        if jit is None:
+            jit = bool(os.environ.get('MARSHMALLOW_SCHEMA_DEFAULT_JIT'))
+        self.jit = jit
 
         marshmallow_plugin = MarshmallowPlugin()
         self.spec = spec = APISpec(
@@ -314,6 +624,8 @@ class RestApi:
         self.jwt = JWTManager()
         self.token_in_blacklist_checker = self.jwt.token_in_blacklist_loader  # shortcut to blacklisting decorator
         self.token_claims_loader = self.jwt.user_claims_loader  # shortcut to user claims decorator
+        self.verification_mode = 'online'
+        self._jwt_access_token_expires = jwt_access_token_expires
 
         spec.components.security_scheme('basic_http', {
             'type': 'http',
@@ -335,6 +647,12 @@ class RestApi:
                 spec.components.security_scheme(name, scheme)
 
         self.default_security_scheme = default_security_scheme
+        self._spec_dict = None  # built lazily on the first /spec request
+        self._spec_bytes = None  # rendered JSON bytes for the spec
+        self._servers = servers
+        self._jsonschema_cache = {}  # (schema_cls, partial, many) -> jsonschema dict
+        self._pending_paths = {}  # swagger path -> operations, flushed to the spec in one go
+        self._parameters_cache = {}  # id(extra_args) -> (extra_args, parameters)
 
         if not isinstance(app, Blueprint):
             self.init_app(app, spec_path, docs_path, servers=servers)  # needs to be called separately when blueprint
@@ -343,17 +661,43 @@ class RestApi:
         """
         This needs to be called with the main app as argument when the api is defined on a flask blueprint.
         """
+        self._servers = servers
+
         @app.route(spec_path)
         def get_spec():
-            spec_dict = self.spec.to_dict()
-            return jsonify({'servers': servers, **spec_dict} if servers is not None else spec_dict)
+            if self._spec_bytes is None:
+                self.finalize_spec()
+            return current_app.response_class(self._spec_bytes, mimetype='application/json')
 
+        if self._jwt_access_token_expires is not None:
+            app.config['JWT_ACCESS_TOKEN_EXPIRES'] = self._jwt_access_token_expires
         self.jwt.init_app(app)
         swaggerui_blueprint = get_swaggerui_blueprint(
             docs_path, spec_path, blueprint_name=docs_blueprint_name
         )
         app.register_blueprint(swaggerui_blueprint, url_prefix=docs_path)
 
+    def set_verification_mode(self, mode):
+        """
+        In 'offline' mode tokens are validated purely by checking their
+        signature locally: no blacklist loader may be attached (this is
+        asserted) and the token_in_blacklist_checker shortcut becomes a no-op
+        decorator. Skipping the per-request revocation round-trip is the main
+        reason offline validation is fast; pair it with a short access token
+        TTL (jwt_access_token_expires) so revocation lag stays bounded.
+        """
+        if mode not in ('offline', 'online'):
+            raise ValueError("verification mode must be 'offline' or 'online'")
+        if mode == 'offline':
+            if getattr(self.jwt, '_token_in_blacklist_callback', None) is not None:
+                raise RuntimeError(
+                    'offline verification cannot be combined with a blacklist loader'
+                )
+            self.token_in_blacklist_checker = lambda callback: callback
+        else:
+            self.token_in_blacklist_checker = self.jwt.token_in_blacklist_loader
+        self.verification_mode = mode
+
     def resource(self, path, name, schema):
         self.spec.components.schema(name, schema=schema)
 
@@ -363,86 +707,137 @@ class RestApi:
         return decorator
 
     def add_resource(self, cls, path, name, schema):
+        if self.jit:
+            schema = _jit_schema(schema)
         cls.name = name
-        cls.id_params = [
-            self.IdParam(self.URL_CONVERTER_TO_TYPE.get(type_, 'string'), name)
-            for (type_, name) in self.RE_URL.findall(path)
-        ]
-
-        base_path = '/'.join(path.split('/')[:-1])
-        view = RestView.as_view(name, schema, cls(), len(cls.id_params))
+        cls.id_params, swagger_path, base_path = self._parse_path(path)
+        cls._parent_id_names = tuple(p.name for p in cls.id_params[:-1])
+        base_swagger_path = self._parse_path(base_path)[1]
+        # gather the per-method registration attributes once instead of doing
+        # repeated getattr walks in every branch below
+        meta = {
+            method_name: (
+                getattr(func, '__extra_args__', None),
+                getattr(func, '__auth_required__', None),
+                func.__doc__
+            )
+            for method_name, func in (
+                (m, getattr(cls, m, None))
+                for m in ('create', 'list', 'retrieve', 'update', 'delete')
+            )
+            if func is not None
+        }
+        view = _specialized_view_cls(name, cls.id_params).as_view(
+            name, schema, cls(), len(cls.id_params)
+        )
+        # schema instances are shared across the branches below rather than
+        # constructed anew for every method registration
+        schema_single = schema()
+        schema_many = schema(many=True) if issubclass(cls, ListResource) else None
+        schema_partial = schema(partial=True) if issubclass(cls, UpdateResource) else None
+        rules = collections.defaultdict(set)  # path -> methods, registered in one go below
         if issubclass(cls, CreateResource):
-            self.resource_methods[name].add('POST')
+            extra_args, auth_required, description = meta['create']
             self.add_path(base_path, view, method='POST',
                             tag=name, id_params=cls.id_params[:-1],
-                            input_schema=schema(), output_schema=schema(),
-                            extra_args=getattr(cls.create, '__extra_args__', None),
-                            auth_required=getattr(cls.create, '__auth_required__', None),
-                            status_code=201, description=cls.create.__doc__)
+                            input_schema=schema_single, output_schema=schema_single,
+                            extra_args=extra_args, auth_required=auth_required,
+                            status_code=201, description=description,
+                            swagger_path=base_swagger_path,
+                            register_rule=False)
+            rules[base_path].add('POST')
         if issubclass(cls, ListResource):
-            self.resource_methods[name].add('GET')
+            extra_args, auth_required, description = meta['list']
             self.add_path(base_path, view, method='GET',
                             tag=name, id_params=cls.id_params[:-1],
-                            output_schema=schema(many=True),
-                            extra_args=getattr(cls.list, '__extra_args__', None),
-                            auth_required=getattr(cls.list, '__auth_required__', None),
-                            description=cls.list.__doc__)
+                            output_schema=schema_many,
+                            extra_args=extra_args, auth_required=auth_required,
+                            description=description,
+                            swagger_path=base_swagger_path,
+                            register_rule=False)
+            rules[base_path].add('GET')
         if issubclass(cls, NonListableRetrieveResource):
-            self.resource_methods[name].add('GET')
+            extra_args, auth_required, description = meta['retrieve']
             self.add_path(path, view, method='GET',
                             tag=name, id_params=cls.id_params,
-                            output_schema=schema(),
-                            extra_args=getattr(cls.retrieve, '__extra_args__', None),
-                            auth_required=getattr(cls.retrieve, '__auth_required__', None),
-                            description=cls.retrieve.__doc__)
+                            output_schema=schema_single,
+                            extra_args=extra_args, auth_required=auth_required,
+                            description=description,
+                            swagger_path=swagger_path,
+                            register_rule=False)
+            rules[path].add('GET')
         if issubclass(cls, ReplaceResource):
-            self.resource_methods[name].add('PUT')
+            extra_args, auth_required, description = meta['update']
             self.add_path(path, view, method='PUT',
                             tag=name, id_params=cls.id_params,
-                            input_schema=schema(), output_schema=schema(),
-                            extra_args=getattr(cls.update, '__extra_args__', None),
-                            auth_required=getattr(cls.update, '__auth_required__', None),
-                            description=cls.update.__doc__)
-            self.app.add_url_rule(path, view_func=view, methods=['PUT'])
+                            input_schema=schema_single, output_schema=schema_single,
+                            extra_args=extra_args, auth_required=auth_required,
+                            description=description,
+                            swagger_path=swagger_path,
+                            register_rule=False)
+            rules[path].add('PUT')
         if issubclass(cls, UpdateResource):
-            self.resource_methods[name].add('PATCH')
+            extra_args, auth_required, description = meta['update']
             self.add_path(path, view, method='PATCH',
                             tag=name, id_params=cls.id_params,
-                            input_schema=schema(partial=True), output_schema=schema(),
-                            extra_args=getattr(cls.update, '__extra_args__', None),
-                            auth_required=getattr(cls.update, '__auth_required__', None),
-                            description=cls.update.__doc__)
-            self.app.add_url_rule(path, view_func=view, methods=['PATCH'])
+                            input_schema=schema_partial, output_schema=schema_single,
+                            extra_args=extra_args, auth_required=auth_required,
+                            description=description,
+                            swagger_path=swagger_path,
+                            register_rule=False)
+            rules[path].add('PATCH')
         if issubclass(cls, DeleteResource):
-            self.resource_methods[name].add('DELETE')
+            extra_args, auth_required, description = meta['delete']
             self.add_path(path, view, method='DELETE',
                             tag=name, id_params=cls.id_params,
-                            extra_args=getattr(cls.delete, '__extra_args__', None),
-                            auth_required=getattr(cls.delete, '__auth_required__', None),
-                            status_code=204, description=cls.delete.__doc__)
-           
+                            extra_args=extra_args, auth_required=auth_required,
+                            status_code=204, description=description,
+                            swagger_path=swagger_path,
+                            register_rule=False)
+            rules[path].add('DELETE')
+
+        # register each path once with all of its methods, instead of
+        # mutating the url map once per (path, method) pair
+        for rule_path, methods in rules.items():
+            self.app.add_url_rule(rule_path, view_func=view, methods=sorted(methods))
+
         return cls
 
     def add_path(self, path, view, method, tag, id_params=None,
                  input_schema=None, output_schema=None, extra_args=None, auth_required=None,
-                 status_code=200, description=''):
-        swagger_path = self.RE_URL.sub(r'{\2}', path)
-        self.app.add_url_rule(path, view_func=view, methods=[method])
+                 status_code=200, description='', swagger_path=None, register_rule=True):
+        if swagger_path is None:
+            swagger_path = self._parse_path(path)[1]
+        if register_rule:
+            self.app.add_url_rule(path, view_func=view, methods=[method])
+        self.resource_methods[tag] |= _METHOD_BITS[method]
 
         parameters = [
             {'name': id_param.name, 'schema': {'type': id_param.type}, 'in': 'path'}
             for id_param in id_params
         ]
         if extra_args:
-            parameters.extend(self.openapi.fields2parameters(extra_args, default_in='query'))
+            # keyed on identity since the same __extra_args__ dict is shared
+            # between methods; the entry keeps the args alive so the id stays
+            # unambiguous
+            entry = self._parameters_cache.get(id(extra_args))
+            if entry is None:
+                entry = (extra_args, self.openapi.fields2parameters(extra_args, default_in='query'))
+                self._parameters_cache[id(extra_args)] = entry
+            parameters.extend(entry[1])
 
         request_body = {}
         if input_schema:
+            key = (type(input_schema), bool(input_schema.partial), input_schema.many)
+            jsonschema = self._jsonschema_cache.get(key)
+            if jsonschema is None:
+                jsonschema = self.openapi.schema2jsonschema(input_schema)
+                self._jsonschema_cache[key] = jsonschema
             request_body['requestBody'] = {
                 'description': '',
                 'content': {
                     'application/json': {
-                        'schema': self.openapi.schema2jsonschema(input_schema)
+                        'schema': jsonschema
                     }
                 }
             }
@@ -450,25 +845,56 @@ class RestApi:
         if auth_required is None:
             auth_required = self.default_security_scheme
 
-        self.spec.path(swagger_path, operations={
-            method.lower(): {
-                'description': description or '',
-                'parameters': parameters,
-                'responses': {
-                    str(status_code): {} if not output_schema else {
-                        'description': '',
-                        'content': {
-                            'application/json': {
-                                'schema': output_schema
-                            }
+        # accumulate the operations per path and register them with the spec
+        # in one spec.path() call each when the spec is finalized, instead of
+        # re-merging the path list once per (path, method) pair
+        self._pending_paths.setdefault(swagger_path, {})[method.lower()] = {
+            'description': description or '',
+            'parameters': parameters,
+            'responses': {
+                str(status_code): {} if not output_schema else {
+                    'description': '',
+                    'content': {
+                        'application/json': {
+                            'schema': output_schema
                         }
                     }
-                },
-                'tags': [tag],
-                'security': [{auth_required: []}] if auth_required else [],
-                **request_body
-            }
-        })
+                }
+            },
+            'tags': [tag],
+            'security': [{auth_required: []}] if auth_required else [],
+            **request_body
+        }
+        self.invalidate_spec_cache()
+
+    def finalize_spec(self):
+        """
+        Render the spec to JSON bytes so /spec requests can be served without
+        re-serializing. Happens lazily on the first /spec request, but can be
+        called eagerly after all resources have been registered.
+        """
+        if self._pending_paths:
+            for swagger_path, operations in self._pending_paths.items():
+                self.spec.path(swagger_path, operations=operations)
+            self._pending_paths.clear()
+        if self._spec_dict is None:
+            spec_dict = self.spec.to_dict()
+            self._spec_dict = (
+                {'servers': self._servers, **spec_dict} if self._servers is not None else spec_dict
+            )
+        if orjson is not None:
+            self._spec_bytes = orjson.dumps(self._spec_dict, default=str)
+        else:
+            self._spec_bytes = flask_json.dumps(self._spec_dict).encode()
+
+    def invalidate_spec_cache(self):
+        """
+        Force the next /spec request to rebuild the spec dictionary. Called
+        automatically whenever a path is added, so it only needs to be called
+        by hand when the spec object is modified directly.
+        """
+        self._spec_dict = None
+        self._spec_bytes = None
 
     def add_blueprint(self, blueprint):
         blueprint.bind(self)
@@ -477,11 +903,11 @@ class RestApi:
 
     def url_for(self, resource_name, _method=None, _external=True, **kwargs):
         if _method is None:
-            methods = self.resource_methods[resource_name]
-            for desired_method in ('GET', 'PUT', 'DELETE', 'POST'):
-                if desired_method in methods:
-                    _method = desired_method
-                    break
+            _method = _DEFAULT_METHOD[self.resource_methods[resource_name]]
+        if has_request_context():
+            return _request_url_for(
+                '.' + resource_name, tuple(sorted(kwargs.items())), _method, _external
+            )
         return url_for('.' + resource_name, _method=_method, _external=_external, **kwargs)
 
 
@@ -517,11 +943,18 @@ class RestApiBlueprint:
 
 def extra_args(args):
 
+    # compile the args into a schema once at decoration time, so webargs
+    # parses with a ready-made instance and introspection (e.g. for the
+    # OpenAPI parameters) can reuse it instead of rebuilding one
+    schema = Schema.from_dict(args)()
+
     def decorator(func):
         if getattr(func, '__extra_args__', None) is None:
             func.__extra_args__ = {}
         func.__extra_args__.update(args)
-        return use_kwargs(args, location='query')(func)
+        wrapper = use_kwargs(schema, location='query')(func)
+        wrapper.__extra_args_schema__ = schema
+        return wrapper
 
     return decorator
 
@@ -531,21 +964,80 @@ def basic_auth_required(func):
     return func
 
 
+_JWT_CACHE_MAXSIZE = 10000
+_JWT_CACHE_TTL = 30  # seconds, override per app via CRUDEST_JWT_CACHE_TTL
+_jwt_cache = {}
+
+
+def _cache_jwt_verification(flavor, func, verified_func):
+    """
+    Front the given jwt-verified view function with a small TTL cache keyed
+    on a hash of the Authorization header, so that repeated requests carrying
+    the same token skip re-validating the signature for a short while. The
+    current app is part of the key, so apps with different secrets never
+    share entries. Only successful verifications are cached; failures always
+    re-verify. The cache is bypassed entirely when blacklisting or a user
+    loader is configured, since those checks need to run on every request.
+    """
+    from flask_jwt_extended.config import config as jwt_config
+    from flask_jwt_extended.utils import has_user_loader
+
+    @functools.wraps(verified_func)
+    def wrapper(*args, **kwargs):
+        auth = request.headers.get('Authorization')
+        if not auth or jwt_config.blacklist_enabled or has_user_loader():
+            return verified_func(*args, **kwargs)
+        key = (
+            id(current_app._get_current_object()),
+            flavor,
+            hashlib.sha256(auth.encode()).hexdigest()[:32]
+        )
+        entry = _jwt_cache.get(key)
+        now = time.time()
+        if entry is not None and now < entry[0]:
+            # inject the cached claims where flask_jwt_extended reads them
+            _app_ctx_stack.top.jwt = entry[1]
+            _app_ctx_stack.top.jwt_header = entry[2]
+            return func(*args, **kwargs)
+        result = verified_func(*args, **kwargs)
+        jwt_data = flask_jwt_extended.get_raw_jwt()
+        if jwt_data:
+            # never keep an entry past the token's own expiration, and allow
+            # tuning (or disabling, with a value <= 0) per app
+            ttl = current_app.config.get('CRUDEST_JWT_CACHE_TTL', _JWT_CACHE_TTL)
+            exp = jwt_data.get('exp')
+            if exp is not None:
+                ttl = min(ttl, exp - now)
+            if ttl > 0:
+                if len(_jwt_cache) >= _JWT_CACHE_MAXSIZE:
+                    _jwt_cache.clear()
+                _jwt_cache[key] = (
+                    now + ttl,
+                    jwt_data,
+                    getattr(_app_ctx_stack.top, 'jwt_header', None)
+                )
+        return result
+
+    return wrapper
+
+
 def jwt_required(func):
     func.__auth_required__ = 'jwt_access_token'
-    return flask_jwt_extended.jwt_required(func)
+    return _cache_jwt_verification('access', func, flask_jwt_extended.jwt_required(func))
 
 
 def jwt_optional(func):
     func.__auth_required__ = 'jwt_access_token'
-    return flask_jwt_extended.jwt_optional(func)
+    return _cache_jwt_verification('optional', func, flask_jwt_extended.jwt_optional(func))
 
 
 def fresh_jwt_required(func):
     func.__auth_required__ = 'jwt_access_token'
-    return flask_jwt_extended.fresh_jwt_required(func)
+    return _cache_jwt_verification('fresh', func, flask_jwt_extended.fresh_jwt_required(func))
 
 
 def jwt_refresh_token_required(func):
     func.__auth_required__ = 'jwt_refresh_token'
-    return flask_jwt_extended.jwt_refresh_token_required(func)
+    return _cache_jwt_verification(
+        'refresh', func, flask_jwt_extended.jwt_refresh_token_required(func)
+    )
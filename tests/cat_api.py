@@ -1,10 +1,10 @@
-import random
-import string
+import itertools
+import secrets
 from typing import collections
 
 from flask.app import Flask
 from flask.json import jsonify
-from marshmallow import Schema, fields
+from marshmallow import Schema, fields, validate
 
 from crudest import (CreateResource, CrudResource, DeleteResource, HeadedResponse, NonListableRetrieveResource, RestApi,
                      RestApiBlueprint, RetrieveResource, UpdateResource, WrappedResponse, extra_args, jwt_required)
@@ -16,6 +16,20 @@ api = RestApi(app, title='Cat API', version='v1')
 
 db = collections.defaultdict(dict)
 
+CAT_PAGE_SIZE = 2
+WHISKER_PAGE_SIZE = 3
+
+_id_counters = {}
+
+
+def _next_id(table):
+    counter = _id_counters.get(table)
+    if counter is None:
+        # start past any pre-seeded rows; afterwards allocation is O(1)
+        # instead of a max() scan over all existing keys per insert
+        counter = _id_counters[table] = itertools.count(max(db[table].keys() or [0]) + 1)
+    return next(counter)
+
 
 class InvalidUsage(Exception):
     status_code = 400
@@ -67,24 +81,31 @@ class CatResource(CreateResource, RetrieveResource, UpdateResource, DeleteResour
 
     @jwt_required
     def create(self, **kwargs):
-        cat_id = max(db['Cat'].keys() or [0]) + 1
+        cat_id = _next_id('Cat')
         cat = {'id': cat_id, **kwargs}
         db['Cat'][cat_id] = cat
         return cat
 
     @jwt_required
-    @extra_args({'page': fields.Int(missing=1)})
-    def list(self, page):
+    @extra_args({
+        'page': fields.Int(missing=1, validate=validate.Range(min=1)),
+        'page_size': fields.Int(missing=CAT_PAGE_SIZE, validate=validate.Range(min=1))
+    })
+    def list(self, page, page_size):
         links = {}
-        values = list(db['Cat'].values())
-        if (page + 1) * 2 <= (len(values) // 2 + 1) * 2:  # is there another page?
-            links['next'] = api.url_for('Cat', page=page+1)
+        total = len(db['Cat'])
+        if page * page_size < total:  # is there another page?
+            next_args = {'page': page + 1}
+            if page_size != CAT_PAGE_SIZE:  # keep the caller's page size
+                next_args['page_size'] = page_size
+            links['next'] = api.url_for('Cat', **next_args)
+        start = (page - 1) * page_size
         # grabbing this opportunity to test headed responses!
         return HeadedResponse(
-            data=values[(page-1)*2:page*2],
+            data=list(itertools.islice(db['Cat'].values(), start, start + page_size)),
             links=links,
             headers={
-                'X-Total-Count': len(values),
+                'X-Total-Count': total,
                 'Pragma': 'no-cache'
             }
         )
@@ -108,10 +129,9 @@ class CatResource(CreateResource, RetrieveResource, UpdateResource, DeleteResour
         if cat_id not in db['Cat']:
             raise InvalidUsage('Cat not found.', status_code=404)
         del db['Cat'][cat_id]
-        # delete corresponding whiskers as well
-        for cat_whisker in list(db['CatWhisker'].values()):
-            if cat_whisker['cat_id'] == cat_id:
-                del db['CatWhisker'][cat_whisker['id']]
+        # delete corresponding whiskers as well, via the secondary index
+        for cat_whisker_id in db['CatWhisker_by_cat'].pop(cat_id, ()):
+            del db['CatWhisker'][cat_whisker_id]
 
 
 @api.resource('/cats/<int:cat_id>/whiskers/<int:cat_whisker_id>', name='CatWhisker', schema=CatWhiskerSchema)
@@ -121,26 +141,34 @@ class CatWhiskerResource(CrudResource):
     def create(self, cat_id, **kwargs):
         if cat_id not in db['Cat']:
             raise InvalidUsage('Cat not found.', status_code=404)
-        cat_whisker_id = max(db['CatWhisker'].keys() or [0]) + 1
+        cat_whisker_id = _next_id('CatWhisker')
         cat_whisker = {'id': cat_whisker_id, 'cat_id': cat_id, **kwargs}
         db['CatWhisker'][cat_whisker_id] = cat_whisker
+        db['CatWhisker_by_cat'].setdefault(cat_id, set()).add(cat_whisker_id)
         return cat_whisker
 
     @jwt_required
-    @extra_args({'page': fields.Int(missing=1)})
-    def list(self, cat_id, page):
+    @extra_args({
+        'page': fields.Int(missing=1, validate=validate.Range(min=1)),
+        'page_size': fields.Int(missing=WHISKER_PAGE_SIZE, validate=validate.Range(min=1))
+    })
+    def list(self, cat_id, page, page_size):
         if cat_id not in db['Cat']:
             raise InvalidUsage('Cat not found.', status_code=404)
         links = {}
-        values = [
-            value for value in db['CatWhisker'].values()
-            if value['cat_id'] == cat_id
-        ]
-        if (page + 1) * 3 <= (len(values) // 3 + 1) * 3:  # is there another page?
-            links['next'] = api.url_for('CatWhisker', cat_id=cat_id, page=page+1)
+        cat_whisker_ids = db['CatWhisker_by_cat'].get(cat_id, ())
+        if page * page_size < len(cat_whisker_ids):  # is there another page?
+            next_args = {'cat_id': cat_id, 'page': page + 1}
+            if page_size != WHISKER_PAGE_SIZE:  # keep the caller's page size
+                next_args['page_size'] = page_size
+            links['next'] = api.url_for('CatWhisker', **next_args)
+        start = (page - 1) * page_size
         # grabbing this opportunity to test wrapped responses!
         return WrappedResponse(
-            data=values[(page-1)*3:page*3],
+            data=[
+                db['CatWhisker'][cat_whisker_id]
+                for cat_whisker_id in sorted(cat_whisker_ids)[start:start + page_size]
+            ],
             links=links
         )
 
@@ -169,6 +197,7 @@ class CatWhiskerResource(CrudResource):
         if cat_whisker_id not in db['CatWhisker']:
             raise InvalidUsage('Whisker not found.', status_code=404)
         del db['CatWhisker'][cat_whisker_id]
+        db['CatWhisker_by_cat'][cat_id].discard(cat_whisker_id)
 
 
 @api.resource('/cats/<int:cat_id>/actions/<int:cat_action_id>', name='CatAction', schema=CatActionSchema)
@@ -204,7 +233,7 @@ class CatSyncResource(CreateResource, NonListableRetrieveResource):
     def create(self, cat_id):
         if cat_id not in db['Cat']:
             raise InvalidUsage('Cat not found.', status_code=404)
-        cat_sync_id = ''.join([random.choice(string.ascii_letters + string.digits) for n in range(32)])
+        cat_sync_id = secrets.token_urlsafe(24)
         cat_sync = {'id': cat_sync_id, 'done': False}
         db['CatSync'][cat_sync_id] = cat_sync
         return cat_sync
@@ -1,5 +1,6 @@
+import copy
+import re
 from decimal import Decimal
-from requests_flask_adapter import Session
 
 import pytest
 
@@ -8,257 +9,328 @@ from crudest import create_access_token, create_refresh_token
 from .cat_api import app, db
 
 
-@pytest.fixture
-def client():
-    # fancier alternative for app.test_client() that uses requests
+def _normalize(d, keys=None):
+    # render every value through str so decimals compare equal to their
+    # serialized form, optionally restricted to the given keys
+    return {k: str(v) for k, v in d.items() if keys is None or k in keys}
+
+
+def parse_links(rv):
+    # minimal Link-header parser, enough for the rel="..." links we emit
+    return {
+        rel: url for url, rel
+        in re.findall(r'<([^>]*)>;\s*rel="([^"]*)"', rv.headers.get('Link', ''))
+    }
+
+
+@pytest.fixture(scope='session', autouse=True)
+def _register_app():
+    # global, idempotent app setup that only needs to happen once; the app
+    # context stays pushed for the whole session so fixtures that need it
+    # (e.g. token signing) don't pay for a push/pop each
     app.config['SERVER_NAME'] = 'feline.io'
-    Session.register('http://feline.io', app)
-    return Session()
+    ctx = app.app_context()
+    ctx.push()
+    yield
+    ctx.pop()
 
 
-@pytest.fixture
+@pytest.fixture(scope='session')
+def client():
+    # the native test client skips the whole HTTP transport layer; one
+    # instance serves the whole session since no test relies on cookies
+    # or other client-side state
+    return app.test_client()
+
+
+@pytest.fixture(scope='session')
 def access_token():
-    with app.app_context():
-        yield create_access_token(identity=1, fresh=True)
+    # signing is identical for every test, so one token serves the session
+    return create_access_token(identity=1, fresh=True)
 
 
-@pytest.fixture
+@pytest.fixture(scope='session')
 def refresh_token():
-    with app.app_context():
-        yield create_refresh_token(identity=1)
+    return create_refresh_token(identity=1)
+
+
+@pytest.fixture(scope='session')
+def auth_headers(access_token):
+    # build the headers dict once rather than in every request call
+    return {'Authorization': 'Bearer ' + access_token}
+
+
+# paths and external urls repeated across tests, bound once at module scope
+BASE_URL = 'http://feline.io'
+CATS_PATH = '/cats'
+CAT1_PATH = '/cats/1'
+CAT1_WHISKERS_PATH = '/cats/1/whiskers'
+CAT1_WHISKER1_PATH = '/cats/1/whiskers/1'
+CAT1_ACTIONS_PATH = '/cats/1/actions'
+CAT1_SYNCS_PATH = '/cats/1/syncs'
+
+# payload values shared by the create/update tests, parsed once like the
+# seed rows below
+NEW_WEIGHT = Decimal('12.34')
+NEW_LENGTH = Decimal('12.34')
+UPDATED_LENGTH = Decimal('9.99')
+
+# the seed rows are built once at import time (Decimal parsing included);
+# seeding the db is then just a matter of copying them in
+_SEED = {
+    'User': {
+        1: {'id': 1, 'name': 'Jon Arbuckle'},
+    },
+    'Cat': {
+        1: {'id': 1, 'name': 'Garfield', 'weight': Decimal('24.67')},
+        2: {'id': 2, 'name': 'Leftfield', 'weight': Decimal('23.28')},
+        3: {'id': 3, 'name': 'Rightfield', 'weight': Decimal('22.73')},
+    },
+    'CatWhisker': {
+        1: {'id': 1, 'cat_id': 1, 'length': Decimal('10.57')},
+        2: {'id': 2, 'cat_id': 1, 'length': Decimal('11.03')},
+        3: {'id': 3, 'cat_id': 1, 'length': Decimal('9.95')},
+        4: {'id': 4, 'cat_id': 1, 'length': Decimal('10.34')},
+    },
+    'CatWhisker_by_cat': {
+        1: {1, 2, 3, 4},
+    },
+    'CatSync': {
+        'URQpbCZ28urcWnEEeCOh3JAbol0XlAax': {'id': 'URQpbCZ28urcWnEEeCOh3JAbol0XlAax', 'done': True},
+    },
+}
+
+
+@pytest.fixture(scope='session')
+def _seed_database():
+    db.clear()
+    for table, rows in _SEED.items():
+        db[table] = {key: copy.copy(value) for key, value in rows.items()}
+    return db
+
+
+def _snapshot():
+    # shallow per-value copies are enough for rollback: the handlers replace
+    # rows wholesale rather than mutating them, and the only values mutated
+    # in place (the whisker index sets) are one copy.copy deep
+    return {
+        table: {key: copy.copy(value) for key, value in rows.items()}
+        for table, rows in db.items()
+    }
 
 
 @pytest.fixture
-def database():
+def database(_seed_database):
+    # seeding happens once per session; each test runs against a snapshot
+    # that is rolled back afterwards, which is cheaper than clearing and
+    # re-inserting every row for every test
+    snapshot = _snapshot()
+    yield db
     db.clear()
-    db['User'][1] = {'id': 1, 'name': 'Jon Arbuckle'}
-    db['Cat'][1] = {'id': 1, 'name': 'Garfield', 'weight': Decimal('24.67')}
-    db['Cat'][2] = {'id': 2, 'name': 'Leftfield', 'weight': Decimal('23.28')}
-    db['Cat'][3] = {'id': 3, 'name': 'Rightfield', 'weight': Decimal('22.73')}
-    db['CatWhisker'][1] = {'id': 1, 'cat_id': 1, 'length': Decimal('10.57')}
-    db['CatWhisker'][2] = {'id': 2, 'cat_id': 1, 'length': Decimal('11.03')}
-    db['CatWhisker'][3] = {'id': 3, 'cat_id': 1, 'length': Decimal('9.95')}
-    db['CatWhisker'][4] = {'id': 4, 'cat_id': 1, 'length': Decimal('10.34')}
-    db['CatSync']['URQpbCZ28urcWnEEeCOh3JAbol0XlAax'] = {'id': 'URQpbCZ28urcWnEEeCOh3JAbol0XlAax', 'done': True}
-    return db
-
+    db.update(snapshot)
 
-def test_create_cat(client, access_token, database):
-    name = 'Simba'
-    weight = Decimal('12.34')
 
-    rv = client.post('http://feline.io/cats', headers={
-        'Authorization': 'Bearer ' + access_token
-    }, data={
-        'name': name,
-        'weight': weight
-    })
+class TestCats:
 
-    assert rv.status_code == 201
-    stored = database['Cat'][rv.json()['id']]
-    assert stored['name'] == name
-    assert stored['weight'] == weight
+    @pytest.fixture(autouse=True)
+    def _setup(self, client, auth_headers, database):
+        # bind the shared fixtures once per test; with the session-scoped
+        # token and seeding this is little more than attribute assignment
+        self.client = client
+        self.headers = auth_headers
+        self.db = database
 
+    def test_get_spec(self):
+        rv = self.client.get('/spec')
+        spec = rv.get_json()
 
-def test_create_cat_whisker(client, access_token, database):
-    cat_id = 1
-    length = Decimal('12.34')
+        assert rv.status_code == 200
+        assert '/cats' in spec['paths']
+        assert '/cats/{cat_id}' in spec['paths']
 
-    rv = client.post(f'http://feline.io/cats/{cat_id}/whiskers', headers={
-        'Authorization': 'Bearer ' + access_token
-    }, data={
-        'length': length
-    })
+        # the cached spec served on subsequent requests should be identical
+        assert self.client.get('/spec').get_json() == spec
 
-    assert rv.status_code == 201
-    stored = database['CatWhisker'][rv.json()['id']]
-    assert stored['cat_id'] == cat_id
-    assert stored['length'] == length
+    def test_create_cat(self):
+        name = 'Simba'
+        weight = NEW_WEIGHT
 
+        rv = self.client.post(CATS_PATH, headers=self.headers, data={
+            'name': name,
+            'weight': weight
+        })
 
-def test_create_cat_action(client, access_token, database):
-    cat_id = 1
-    verb = 'meow'
+        assert rv.status_code == 201
+        stored = self.db['Cat'][rv.get_json()['id']]
+        assert stored['name'] == name
+        assert stored['weight'] == weight
 
-    rv = client.post(f'http://feline.io/cats/{cat_id}/actions', headers={
-        'Authorization': 'Bearer ' + access_token
-    }, data={
-        'verb': verb
-    })
+    def test_create_cat_whisker(self):
+        cat_id = 1
+        length = NEW_LENGTH
 
-    assert rv.status_code == 201
-    assert rv.json()['links']['collection'] == 'http://feline.io/cats/1/actions'
-
-
-def test_create_cat_sync(client, access_token, database):
-    cat_id = 1
+        rv = self.client.post(CAT1_WHISKERS_PATH, headers=self.headers, data={
+            'length': length
+        })
 
-    rv = client.post(f'http://feline.io/cats/{cat_id}/syncs', headers={
-        'Authorization': 'Bearer ' + access_token
-    })
+        assert rv.status_code == 201
+        stored = self.db['CatWhisker'][rv.get_json()['id']]
+        assert stored['cat_id'] == cat_id
+        assert stored['length'] == length
 
-    assert rv.status_code == 201
-    assert not rv.json()['done']
+    def test_create_cat_action(self):
+        verb = 'meow'
 
+        rv = self.client.post(CAT1_ACTIONS_PATH, headers=self.headers, data={
+            'verb': verb
+        })
 
-def test_list_cats(client, access_token, database):
-    rv = client.get('http://feline.io/cats', headers={
-        'Authorization': 'Bearer ' + access_token
-    })
-    results = rv.json()
+        assert rv.status_code == 201
+        assert rv.get_json()['links']['collection'] == BASE_URL + CAT1_ACTIONS_PATH
 
-    assert rv.status_code == 200
-    assert isinstance(results, list)
-    assert len(results) == 2  # page size is 2
+    def test_create_cat_sync(self):
+        rv = self.client.post(CAT1_SYNCS_PATH, headers=self.headers)
+
+        assert rv.status_code == 201
+        assert not rv.get_json()['done']
 
-    first_result = results[0]
-    stored = database['Cat'][1]
-    for key in stored.keys():
-        assert str(first_result[key]) == str(stored[key])  # to str because decimals
+    def test_list_cats(self):
+        rv = self.client.get(CATS_PATH, headers=self.headers)
+        results = rv.get_json()
 
-    assert 'access-control-expose-headers' in rv.headers
-    assert 'link' in rv.headers['access-control-expose-headers'].lower()
-    assert 'x-total-count' in rv.headers['access-control-expose-headers'].lower()
-    assert 'pragma' not in rv.headers['access-control-expose-headers'].lower()
-    
-    assert 'link' in rv.headers
-    assert rv.links['self']['url'] == 'http://feline.io/cats'
-    assert rv.links['next']['url'] == 'http://feline.io/cats?page=2'
-    assert 'x-total-count' in rv.headers
-    assert int(rv.headers['x-total-count']) == len(database['Cat'])
-    assert 'pragma' in rv.headers
-
-    rv = client.get(f'http://feline.io/cats?page=2', headers={
-        'Authorization': 'Bearer ' + access_token
-    })
-    results = rv.json()
+        assert rv.status_code == 200
+        assert isinstance(results, list)
+        assert len(results) == 2  # page size is 2
 
-    assert rv.status_code == 200
-    assert len(results) == 1  # only 1 left on last page
-    assert 'next' not in rv.links
-
-
-def test_list_cat_whiskers(client, access_token, database):
-    rv = client.get('http://feline.io/cats/1/whiskers', headers={
-        'Authorization': 'Bearer ' + access_token
-    })
-    results = rv.json()
-
-    assert rv.status_code == 200
-    assert isinstance(results, dict)
-    assert 'data' in results
-    assert len(results['data']) == 3  # page size is 3
-
-    first_result = results['data'][0]
-    stored = database['CatWhisker'][1]
-    for key in first_result:
-        assert str(first_result[key]) == str(stored[key])  # to str because decimals
+        first_result = results[0]
+        assert _normalize(first_result) == _normalize(self.db['Cat'][1])
 
-    assert 'links' in results
-    assert results['links']['self'] == 'http://feline.io/cats/1/whiskers'
-    assert results['links']['next'] == 'http://feline.io/cats/1/whiskers?page=2'
-
-    rv = client.get(f'http://feline.io/cats/1/whiskers?page=2', headers={
-        'Authorization': 'Bearer ' + access_token
-    })
-    results = rv.json()
-
-    assert rv.status_code == 200
-    assert len(results['data']) == 1  # only 1 left on last page
-    assert 'next' not in results['links']
+        assert 'access-control-expose-headers' in rv.headers
+        assert 'link' in rv.headers['access-control-expose-headers'].lower()
+        assert 'x-total-count' in rv.headers['access-control-expose-headers'].lower()
+        assert 'pragma' not in rv.headers['access-control-expose-headers'].lower()
 
+        links = parse_links(rv)
+        assert 'link' in rv.headers
+        assert links['self'] == BASE_URL + CATS_PATH
+        assert links['next'] == BASE_URL + CATS_PATH + '?page=2'
+        assert 'x-total-count' in rv.headers
+        assert int(rv.headers['x-total-count']) == len(self.db['Cat'])
+        assert 'pragma' in rv.headers
 
-def test_retrieve_cat(client, access_token, database):
-    rv = client.get('http://feline.io/cats/1', headers={
-        'Authorization': 'Bearer ' + access_token
-    })
-    result = rv.json()
-
-    assert rv.status_code == 200
-    stored = database['Cat'][1]
-    for key in stored.keys():
-        assert str(result[key]) == str(stored[key])  # to str because decimals
+        rv = self.client.get(CATS_PATH + '?page=2', headers=self.headers)
+        results = rv.get_json()
+
+        assert rv.status_code == 200
+        assert len(results) == 1  # only 1 left on last page
+        assert 'next' not in parse_links(rv)
 
+    def test_list_cats_page_size(self):
+        rv = self.client.get(CATS_PATH + '?page_size=10', headers=self.headers)
+        results = rv.get_json()
 
-def test_retrieve_cat_whisker(client, access_token, database):
-    rv = client.get('http://feline.io/cats/1/whiskers/1', headers={
-        'Authorization': 'Bearer ' + access_token
-    })
-    result = rv.json()
+        assert rv.status_code == 200
+        assert len(results) == len(self.db['Cat'])  # everything fits on one page
+        assert 'next' not in parse_links(rv)
+
+        rv = self.client.get(CATS_PATH + '?page_size=1', headers=self.headers)
+
+        assert rv.status_code == 200
+        assert len(rv.get_json()) == 1
+        # the next link keeps the requested page size
+        assert parse_links(rv)['next'] == BASE_URL + CATS_PATH + '?page=2&page_size=1'
 
-    assert rv.status_code == 200
-    stored = database['CatWhisker'][1]
-    for key in result:
-        assert str(result[key]) == str(stored[key])  # to str because decimals
-
-
-def test_retrieve_cat_sync(client, access_token, database):
-    cat_sync_id = 'URQpbCZ28urcWnEEeCOh3JAbol0XlAax'
-
-    rv = client.get(f'http://feline.io/cats/1/syncs/{cat_sync_id}', headers={
-        'Authorization': 'Bearer ' + access_token
-    })
-    result = rv.json()
-
-    assert rv.status_code == 200
-    stored = database['CatSync'][cat_sync_id]
-    for key in stored.keys():
-        assert result['data'][key] == stored[key]
-    assert result['links']['self'] == f'http://feline.io/cats/1/syncs/{cat_sync_id}'
-
-
-def test_update_cat(client, access_token, database):
-    name = 'Garfield aka The Fat Cat'
-
-    rv = client.patch('http://feline.io/cats/1', headers={
-        'Authorization': 'Bearer ' + access_token
-    }, data={
-        'name': name
-    })
-    result = rv.json()
-
-    assert rv.status_code == 200
-    stored = database['Cat'][result['id']]
-    assert stored['name'] == name
-    assert stored['weight'] == Decimal(result['weight'])
-
-    rv = client.put('http://feline.io/cats/1', headers={
-        'Authorization': 'Bearer ' + access_token
-    }, data={
-        'name': name
-    })
-    assert rv.status_code == 422  # put doesn't allow partial updates
+        # zero and negative paging values are rejected, not served
+        assert self.client.get(CATS_PATH + '?page=0', headers=self.headers).status_code == 422
+        assert self.client.get(CATS_PATH + '?page_size=-1', headers=self.headers).status_code == 422
 
+    def test_list_cat_whiskers(self):
+        rv = self.client.get(CAT1_WHISKERS_PATH, headers=self.headers)
+        results = rv.get_json()
 
-def test_update_cat_whisker(client, access_token, database):
-    length = Decimal('9.99')
+        assert rv.status_code == 200
+        assert isinstance(results, dict)
+        assert 'data' in results
+        assert len(results['data']) == 3  # page size is 3
+
+        first_result = results['data'][0]
+        stored = self.db['CatWhisker'][1]
+        assert _normalize(first_result) == _normalize(stored, keys=first_result)
+
+        assert 'links' in results
+        assert results['links']['self'] == BASE_URL + CAT1_WHISKERS_PATH
+        assert results['links']['next'] == BASE_URL + CAT1_WHISKERS_PATH + '?page=2'
+
+        rv = self.client.get(CAT1_WHISKERS_PATH + '?page=2', headers=self.headers)
+        results = rv.get_json()
 
-    rv = client.put('http://feline.io/cats/1/whiskers/1', headers={
-        'Authorization': 'Bearer ' + access_token
-    }, data={
-        'length': length
-    })
-    result = rv.json()
+        assert rv.status_code == 200
+        assert len(results['data']) == 1  # only 1 left on last page
+        assert 'next' not in results['links']
 
-    assert rv.status_code == 200
-    stored = database['CatWhisker'][result['id']]
-    assert stored['length'] == Decimal(result['length'])
+    @pytest.mark.parametrize('path, table, key', [
+        (CAT1_PATH, 'Cat', 1),
+        (CAT1_WHISKER1_PATH, 'CatWhisker', 1),
+    ])
+    def test_retrieve(self, path, table, key):
+        rv = self.client.get(path, headers=self.headers)
+        result = rv.get_json()
 
+        assert rv.status_code == 200
+        stored = self.db[table][key]
+        assert _normalize(result) == _normalize(stored, keys=result)
 
-def test_delete_cat(client, access_token, database):
-    rv = client.delete('http://feline.io/cats/1', headers={
-        'Authorization': 'Bearer ' + access_token
-    })
+    def test_retrieve_cat_sync(self):
+        cat_sync_id = 'URQpbCZ28urcWnEEeCOh3JAbol0XlAax'
+
+        rv = self.client.get(f'{CAT1_SYNCS_PATH}/{cat_sync_id}', headers=self.headers)
+        result = rv.get_json()
+
+        assert rv.status_code == 200
+        stored = self.db['CatSync'][cat_sync_id]
+        for key in stored.keys():
+            assert result['data'][key] == stored[key]
+        assert result['links']['self'] == f'{BASE_URL}{CAT1_SYNCS_PATH}/{cat_sync_id}'
+
+    def test_update_cat(self):
+        name = 'Garfield aka The Fat Cat'
+
+        rv = self.client.patch(CAT1_PATH, headers=self.headers, data={
+            'name': name
+        })
+        result = rv.get_json()
+
+        assert rv.status_code == 200
+        stored = self.db['Cat'][result['id']]
+        assert stored['name'] == name
+        assert stored['weight'] == Decimal(result['weight'])
+
+        rv = self.client.put(CAT1_PATH, headers=self.headers, data={
+            'name': name
+        })
+        assert rv.status_code == 422  # put doesn't allow partial updates
+
+    def test_update_cat_whisker(self):
+        length = UPDATED_LENGTH
+
+        rv = self.client.put(CAT1_WHISKER1_PATH, headers=self.headers, data={
+            'length': length
+        })
+        result = rv.get_json()
 
-    assert rv.status_code == 204
-    assert 1 not in database['Cat']
-    assert 1 not in set(cw['cat_id'] for cw in database['CatWhisker'].values())
+        assert rv.status_code == 200
+        stored = self.db['CatWhisker'][result['id']]
+        assert stored['length'] == Decimal(result['length'])
+
+    def test_delete_cat(self):
+        rv = self.client.delete(CAT1_PATH, headers=self.headers)
 
+        assert rv.status_code == 204
+        assert 1 not in self.db['Cat']
+        assert 1 not in set(cw['cat_id'] for cw in self.db['CatWhisker'].values())
 
-def test_delete_cat_whisker(client, access_token, database):
-    rv = client.delete('http://feline.io/cats/1/whiskers/1', headers={
-        'Authorization': 'Bearer ' + access_token
-    })
+    def test_delete_cat_whisker(self):
+        rv = self.client.delete(CAT1_WHISKER1_PATH, headers=self.headers)
 
-    assert rv.status_code == 204
-    assert 1 not in database['CatWhisker']
+        assert rv.status_code == 204
+        assert 1 not in self.db['CatWhisker']